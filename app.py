@@ -4,22 +4,28 @@
 - CatBoost 기반 예측 + SHAP 분석
 - Streamlit Cloud 배포용 (Google Drive 연동)
 """
+import matplotlib
+matplotlib.use('Agg')  # GUI backend 탐색 생략 (비대화형 렌더링 고정)
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
 import io
 import os
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
-# 한글 폰트 설정 (Streamlit Cloud 호환)
-plt.rcParams['font.family'] = 'DejaVu Sans'
-plt.rcParams['axes.unicode_minus'] = False
-plt.rcParams['figure.autolayout'] = True
+# 한글 폰트 설정 (Streamlit Cloud 호환) — rcParams는 import 시 1회만 설정
+plt.rcParams.update({
+    'font.family': 'DejaVu Sans',
+    'axes.unicode_minus': False,
+    'figure.autolayout': True,
+})
 
 import streamlit as st
 import pandas as pd
 import numpy as np
 import joblib
-import shap
+from catboost import CatBoostClassifier, Pool
 from pathlib import Path
 
 # Google Drive API
@@ -37,8 +43,8 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# CSS: 사이드바 스타일링
-st.markdown("""
+# CSS: 사이드바 스타일링 (문자열은 import 시 1회만 구성)
+_CSS_BLOCK = """
 <style>
     /* 사이드바 숨김 버튼 제거 시도 */
     button[kind="header"] {
@@ -86,7 +92,8 @@ st.markdown("""
     }
     
     /* 예측 버튼 하단 고정 */
-    div.stButton > button[kind="primary"] {
+    div.stButton > button[kind="primary"],
+    div[data-testid="stFormSubmitButton"] > button {
         position: fixed !important;
         bottom: 20px !important;
         width: 310px !important;
@@ -95,7 +102,18 @@ st.markdown("""
         border: none !important;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+def _inject_css():
+    """스타일 블록 주입
+
+    Streamlit은 rerun 시 다시 그리지 않은 요소를 페이지에서 제거하므로
+    매 실행마다 주입해야 한다. form 도입으로 rerun 자체가 제출 시에만
+    발생해 실질 비용은 제출당 1회다.
+    """
+    st.markdown(_CSS_BLOCK, unsafe_allow_html=True)
+
+_inject_css()
 
 # Google Drive 파일 ID 설정
 FILE_IDS = {
@@ -117,7 +135,7 @@ DISEASE_NAMES_KR = {
 # ========================================
 # Feature 정의
 # ========================================
-INPUT_FEATURES = [
+INPUT_FEATURES = (
     'symptoms_frequency', 'symptoms_recurrence', 'symptom_recent',
     'symptom_remote_cat', 'symptom_remote_cat_is_1st_attack',
     'symptom_remote_cat_is_within_30days', 'symptom_remote_cat_is_within_1years',
@@ -147,258 +165,356 @@ INPUT_FEATURES = [
     'etc_hsn_right', 'etc_hsn_left', 'etc_htt_right', 'etc_htt_left',
     'etc_skew_deviation_right', 'etc_skew_deviation_left',
     'etc_weber_right', 'etc_weber_left', 'age', 'sex'
-]
+)
+
+# feature 이름 → 열 위치 (O(1) lookup, import 시 1회 생성)
+_FEAT_INDEX = {f: i for i, f in enumerate(INPUT_FEATURES)}
+
+# DataFrame 생성 시 Index 재구축을 피하기 위한 공유 열 인덱스
+_FEATURE_COLUMNS = pd.Index(INPUT_FEATURES)
 
 # ========================================
 # Google Drive 연동 함수
 # ========================================
-def get_google_drive_service():
-    """Google Drive API 서비스 생성"""
+def get_google_drive_credentials():
+    """Google Drive API 인증 정보 생성"""
     try:
         creds_dict = dict(st.secrets["google"])
         if "private_key" in creds_dict:
             creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
-        
-        creds = Credentials.from_service_account_info(
+
+        return Credentials.from_service_account_info(
             creds_dict,
             scopes=['https://www.googleapis.com/auth/drive.readonly']
         )
-        service = build('drive', 'v3', credentials=creds)
-        return service
     except Exception as e:
         st.error(f"Google Drive 인증 오류: {e}")
         return None
 
-def download_file_from_drive(service, file_id, destination):
-    """Google Drive에서 파일 다운로드"""
-    try:
-        request = service.files().get_media(fileId=file_id)
-        with open(destination, 'wb') as f:
-            downloader = MediaIoBaseDownload(f, request)
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-        return True
-    except Exception as e:
-        st.error(f"파일 다운로드 오류: {e}")
-        return False
+def download_file_from_drive(creds, file_id, fileobj):
+    """Google Drive에서 열린 파일 객체로 파일 다운로드 (worker 스레드에서 실행)
+
+    httplib2는 thread-safe하지 않으므로 스레드마다 service를 새로 만든다.
+    실패 시 예외를 그대로 올려 메인 스레드에서 보고하게 한다.
+    """
+    service = build('drive', 'v3', credentials=creds)
+    request = service.files().get_media(fileId=file_id)
+    # 기본 chunksize(~100KB)는 round trip이 너무 많음 → 16MiB로 확대
+    downloader = MediaIoBaseDownload(fileobj, request, chunksize=16*1024*1024)
+    done = False
+    while not done:
+        status, done = downloader.next_chunk()
 
 # ========================================
 # 모델 로드 함수
 # ========================================
+def _load_model_file(path):
+    """모델 파일 로드: CatBoost 네이티브 포맷(.cbm) 우선, 기존 joblib pickle 호환"""
+    try:
+        model = CatBoostClassifier()
+        model.load_model(path)
+        return model
+    except Exception:
+        return joblib.load(path)
+
 @st.cache_resource
 def load_models():
     """Google Drive에서 모델 다운로드 및 로드 (캐싱)"""
-    service = get_google_drive_service()
-    if service is None:
+    creds = get_google_drive_credentials()
+    if creds is None:
         return None
     
     models = {}
     temp_dir = tempfile.gettempdir()
-    
+    cache_paths = {
+        name: os.path.join(temp_dir, f"label_{name.lower()}_model.joblib")
+        for name in FILE_IDS
+    }
+
+    # 컨테이너 재사용(warm) 시에는 디스크 캐시에서 바로 로드 → 재다운로드 생략
+    to_download = {}
     for name, file_id in FILE_IDS.items():
+        cache_path = cache_paths[name]
+        if os.path.exists(cache_path) and os.path.getsize(cache_path) > 0:
+            try:
+                models[name] = _load_model_file(cache_path)
+                continue
+            except Exception:
+                pass  # 손상된 캐시 파일은 재다운로드
+        to_download[name] = file_id
+
+    if not to_download:
+        return models
+
+    buffers = {name: io.BytesIO() for name in to_download}
+
+    # 다운로드는 네트워크 I/O bound → 파일 동시 다운로드 (디스크 우회, 메모리 직행)
+    with ThreadPoolExecutor(max_workers=len(to_download)) as executor:
+        futures = {
+            name: executor.submit(download_file_from_drive, creds, file_id, buffers[name])
+            for name, file_id in to_download.items()
+        }
+
+    for name in to_download:
         try:
-            temp_path = os.path.join(temp_dir, f"label_{name.lower()}_model.joblib")
-            
-            if download_file_from_drive(service, file_id, temp_path):
-                models[name] = joblib.load(temp_path)
-            else:
-                st.error(f"{name} 모델 다운로드 실패")
-                return None
+            futures[name].result()  # worker에서 발생한 예외는 여기서 전파
+            buf = buffers[name]
+            # 디스크에 보관한 뒤 포맷 자동 감지 로드 (.cbm 또는 joblib)
+            try:
+                with open(cache_paths[name], 'wb') as f:
+                    f.write(buf.getbuffer())
+                models[name] = _load_model_file(cache_paths[name])
+            except OSError:
+                # 디스크 기록 불가 시 메모리에서 pickle 경로로 직접 로드
+                buf.seek(0)
+                models[name] = joblib.load(buf)
         except Exception as e:
-            st.error(f"{name} 모델 로드 오류: {e}")
+            st.error(f"{name} 모델 다운로드/로드 오류: {e}")
             return None
-    
+
     return models
 
 # ========================================
 # 입력 UI 함수 (제목 + 구분선으로 섹션 구분)
 # ========================================
 def create_sidebar_inputs():
-    """사이드바 입력 UI 생성"""
+    """사이드바 입력 UI 생성 (form으로 묶어 제출 시에만 rerun 발생)"""
     st.sidebar.title("🩺 환자 정보 입력")
-    
+
     inputs = {}
-    
-    # ========== 기본 정보 ==========
-    st.sidebar.markdown('<div class="section-header">📋 기본 정보</div>', unsafe_allow_html=True)
-    inputs['patient_name'] = st.sidebar.text_input("환자 이름", value="", key="patient_name")
-    inputs['age'] = st.sidebar.number_input("나이", min_value=10, max_value=100, value=50, key="age")
-    sex_option = st.sidebar.selectbox("성별", ["여성", "남성"], key="sex")
-    inputs['sex'] = 1 if sex_option == "여성" else 0
-    st.sidebar.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
-    
-    # ========== 어지럼증 특성 ==========
-    st.sidebar.markdown('<div class="section-header">🌀 어지럼증 특성</div>', unsafe_allow_html=True)
-    
-    inputs['symptoms_true_vertigo'] = float(st.sidebar.checkbox("회전성 어지럼증 (빙글빙글 도는 느낌)", key="true_vertigo"))
-    inputs['symptoms_dizziness_duration_ongoing'] = float(st.sidebar.checkbox("현재 어지럼증 지속 중", key="ongoing"))
-    
-    inputs['symptom_recent'] = st.sidebar.number_input(
-        "최근 어지럼증 발생일 (며칠 전)", min_value=0, max_value=180, value=1, key="recent"
-    )
-    
-    frequency_options = {
-        "1회": 1, "2-3회": 2, "4-5회": 3, "6-10회": 4, "10회 이상": 5
-    }
-    freq_selected = st.sidebar.selectbox("어지럼증 발생 빈도", list(frequency_options.keys()), key="frequency")
-    inputs['symptoms_frequency'] = float(frequency_options[freq_selected])
-    
-    inputs['symptoms_recurrence'] = float(st.sidebar.checkbox("재발성 어지럼증", key="recurrence"))
-    
-    # 지속 시간
-    duration_cat_options = {
-        "수 초": 1, "수 분": 2, "수 시간": 3, "수 일": 4
-    }
-    duration_selected = st.sidebar.selectbox("어지럼증 지속 시간", list(duration_cat_options.keys()), key="duration")
-    inputs['symptoms_duration_minutes_cat_gen'] = float(duration_cat_options[duration_selected])
-    
-    inputs['symptoms_duration_minutes_cat_gen_is_several_sec'] = 1.0 if duration_selected == "수 초" else 0.0
-    inputs['symptoms_duration_minutes_cat_gen_is_several_min'] = 1.0 if duration_selected == "수 분" else 0.0
-    inputs['symptoms_duration_minutes_cat_gen_is_several_hours'] = 1.0 if duration_selected == "수 시간" else 0.0
-    inputs['symptoms_duration_minutes_cat_gen_is_several_days'] = 1.0 if duration_selected == "수 일" else 0.0
-    
-    inputs['symptoms_duration_minutes_cat_20m'] = inputs['symptoms_duration_minutes_cat_gen']
-    inputs['symptoms_duration_minutes_cat_20m_is_several_sec'] = inputs['symptoms_duration_minutes_cat_gen_is_several_sec']
-    inputs['symptoms_duration_minutes_cat_20m_is_several_min'] = inputs['symptoms_duration_minutes_cat_gen_is_several_min']
-    inputs['symptoms_duration_minutes_cat_20m_is_several_hours'] = inputs['symptoms_duration_minutes_cat_gen_is_several_hours']
-    inputs['symptoms_duration_minutes_cat_20m_is_several_days'] = inputs['symptoms_duration_minutes_cat_gen_is_several_days']
-    
-    duration_minutes_map = {"수 초": 0.5, "수 분": 5, "수 시간": 120, "수 일": 1440}
-    inputs['symptoms_duration_minutes'] = duration_minutes_map[duration_selected]
-    
-    # 과거 발생 시점
-    remote_cat_options = {
-        "첫 발작": 0, "30일 이내": 1, "1년 이내": 2, "1년 이상": 3
-    }
-    remote_selected = st.sidebar.selectbox("과거 어지럼증 발생 시점", list(remote_cat_options.keys()), key="remote")
-    inputs['symptom_remote_cat'] = float(remote_cat_options[remote_selected])
-    inputs['symptom_remote_cat_is_1st_attack'] = 1.0 if remote_selected == "첫 발작" else 0.0
-    inputs['symptom_remote_cat_is_within_30days'] = 1.0 if remote_selected == "30일 이내" else 0.0
-    inputs['symptom_remote_cat_is_within_1years'] = 1.0 if remote_selected == "1년 이내" else 0.0
-    inputs['symptom_remote_cat_is_over_1year'] = 1.0 if remote_selected == "1년 이상" else 0.0
-    
-    st.sidebar.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
-    
-    # ========== 동반 증상 ==========
-    st.sidebar.markdown('<div class="section-header">🤢 동반 증상</div>', unsafe_allow_html=True)
-    
-    inputs['symptoms_nausea'] = float(st.sidebar.checkbox("오심 (메스꺼움)", key="nausea"))
-    inputs['symptoms_vomiting'] = float(st.sidebar.checkbox("구토", key="vomiting"))
-    inputs['symptoms_headache'] = float(st.sidebar.checkbox("두통", key="headache"))
-    inputs['symptoms_black_out'] = float(st.sidebar.checkbox("실신/눈앞이 캄캄함", key="blackout"))
-    
-    st.sidebar.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
-    
-    # ========== 이과적 증상 ==========
-    st.sidebar.markdown('<div class="section-header">👂 이과적 증상</div>', unsafe_allow_html=True)
-    
-    inputs['symptoms_hearing_impairment_combined'] = float(st.sidebar.checkbox("청력 저하", key="hearing"))
-    inputs['symptoms_tinnitus'] = float(st.sidebar.checkbox("이명", key="tinnitus"))
-    inputs['symptoms_ear_fullness'] = float(st.sidebar.checkbox("이충만감", key="ear_fullness"))
-    
-    st.sidebar.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
-    
-    # ========== 악화/완화 요인 ==========
-    st.sidebar.markdown('<div class="section-header">⚡ 악화/완화 요인</div>', unsafe_allow_html=True)
-    
-    st.sidebar.markdown("**악화 요인**")
-    inputs['symptoms_agg_factor_position_change'] = float(st.sidebar.checkbox("체위 변화 시 악화", key="agg_position"))
-    inputs['symptoms_agg_factor_head_rotation'] = float(st.sidebar.checkbox("머리 회전 시 악화", key="agg_head"))
-    inputs['symptoms_agg_factor_eyes_moving'] = float(st.sidebar.checkbox("눈 움직일 때 악화", key="agg_eyes"))
-    inputs['symptoms_agg_factor_moving'] = float(st.sidebar.checkbox("움직일 때 악화", key="agg_moving"))
-    inputs['symptoms_agg_factor_no_moving'] = float(st.sidebar.checkbox("가만히 있을 때 악화", key="agg_no_moving"))
-    inputs['symptoms_agg_factor_position_change_combined'] = inputs['symptoms_agg_factor_position_change']
-    
-    st.sidebar.markdown("**완화 요인**")
-    inputs['symptoms_rel_factor_rest'] = float(st.sidebar.checkbox("휴식 시 완화", key="rel_rest"))
-    inputs['symptoms_rel_factor_eyes_closed'] = float(st.sidebar.checkbox("눈 감으면 완화", key="rel_eyes"))
-    
-    st.sidebar.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
-    
-    # ========== 과거력 ==========
-    st.sidebar.markdown('<div class="section-header">📜 과거력</div>', unsafe_allow_html=True)
-    
-    col1, col2 = st.sidebar.columns(2)
-    with col1:
-        inputs['history_dm'] = float(st.checkbox("당뇨병", key="hist_dm"))
-        inputs['history_htn'] = float(st.checkbox("고혈압", key="hist_htn"))
-        inputs['history_ear_disease'] = float(st.checkbox("귀 질환", key="hist_ear"))
-        inputs['history_brain_disease'] = float(st.checkbox("뇌질환", key="hist_brain"))
-        inputs['history_thyroid_disease'] = float(st.checkbox("갑상선질환", key="hist_thyroid"))
-        inputs['history_psychiatric'] = float(st.checkbox("정신과질환", key="hist_psych"))
-    
-    with col2:
-        inputs['history_coronary_disease'] = float(st.checkbox("관상동맥질환", key="hist_coronary"))
-        inputs['history_trauma'] = float(st.checkbox("외상력", key="hist_trauma"))
-        inputs['history_entop'] = float(st.checkbox("이비인후과 수술력", key="hist_entop"))
-        inputs['history_metabolic_disease'] = float(st.checkbox("대사질환", key="hist_metabolic"))
-        inputs['history_autoimmune_disease'] = float(st.checkbox("자가면역질환", key="hist_autoimmune"))
-        inputs['history_respiratory_disease'] = float(st.checkbox("호흡기질환", key="hist_respiratory"))
-    
-    other_history = [
-        'history_pul_tbc', 'history_asthma', 'history_kidney', 'history_neckop',
-        'history_stomach', 'history_bph', 'history_gynecologic', 'history_eye_disease',
-        'history_pci', 'history_abdominalop', 'history_orthopedicop', 'history_ra'
-    ]
-    for h in other_history:
-        if h not in inputs:
-            inputs[h] = 0.0
-    
-    st.sidebar.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
-    
-    # ========== 신체검사 소견 ==========
-    st.sidebar.markdown('<div class="section-header">🔍 신체검사 소견</div>', unsafe_allow_html=True)
-    
-    st.sidebar.markdown("**안진 검사**")
-    col1, col2 = st.sidebar.columns(2)
-    with col1:
-        inputs['etc_sn_right'] = float(st.checkbox("자발안진 (우)", key="sn_r"))
-        inputs['etc_gaze_right'] = float(st.checkbox("주시안진 (우)", key="gaze_r"))
-        inputs['etc_dht_right'] = float(st.checkbox("Dix-Hallpike (우)", key="dht_r"))
-        inputs['etc_rht_right'] = float(st.checkbox("Roll test (우)", key="rht_r"))
-    with col2:
-        inputs['etc_sn_left'] = float(st.checkbox("자발안진 (좌)", key="sn_l"))
-        inputs['etc_gaze_left'] = float(st.checkbox("주시안진 (좌)", key="gaze_l"))
-        inputs['etc_dht_left'] = float(st.checkbox("Dix-Hallpike (좌)", key="dht_l"))
-        inputs['etc_rht_left'] = float(st.checkbox("Roll test (좌)", key="rht_l"))
-    
-    st.sidebar.markdown("**기타 검사**")
-    col1, col2 = st.sidebar.columns(2)
-    with col1:
-        inputs['etc_hit_right'] = float(st.checkbox("HIT (우)", key="hit_r"))
-        inputs['etc_hsn_right'] = float(st.checkbox("HSN (우)", key="hsn_r"))
-        inputs['etc_htt_right'] = float(st.checkbox("HTT (우)", key="htt_r"))
-    with col2:
-        inputs['etc_hit_left'] = float(st.checkbox("HIT (좌)", key="hit_l"))
-        inputs['etc_hsn_left'] = float(st.checkbox("HSN (좌)", key="hsn_l"))
-        inputs['etc_htt_left'] = float(st.checkbox("HTT (좌)", key="htt_l"))
-    
-    other_etc = [
-        'etc_gn_right', 'etc_gn_left', 'etc_skew_deviation_right', 'etc_skew_deviation_left',
-        'etc_weber_right', 'etc_weber_left'
-    ]
-    for e in other_etc:
-        if e not in inputs:
-            inputs[e] = 0.0
-    
-    return inputs
+
+    with st.sidebar.form("patient_form"):
+        # ========== 기본 정보 ==========
+        st.markdown('<div class="section-header">📋 기본 정보</div>', unsafe_allow_html=True)
+        inputs['patient_name'] = st.text_input("환자 이름", value="", key="patient_name")
+        inputs['age'] = st.number_input("나이", min_value=10, max_value=100, value=50, key="age")
+        sex_option = st.selectbox("성별", ["여성", "남성"], key="sex")
+        inputs['sex'] = 1 if sex_option == "여성" else 0
+        st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
+
+        # ========== 어지럼증 특성 ==========
+        st.markdown('<div class="section-header">🌀 어지럼증 특성</div>', unsafe_allow_html=True)
+
+        inputs['symptoms_true_vertigo'] = float(st.checkbox("회전성 어지럼증 (빙글빙글 도는 느낌)", key="true_vertigo"))
+        inputs['symptoms_dizziness_duration_ongoing'] = float(st.checkbox("현재 어지럼증 지속 중", key="ongoing"))
+
+        inputs['symptom_recent'] = st.number_input(
+            "최근 어지럼증 발생일 (며칠 전)", min_value=0, max_value=180, value=1, key="recent"
+        )
+
+        frequency_options = {
+            "1회": 1, "2-3회": 2, "4-5회": 3, "6-10회": 4, "10회 이상": 5
+        }
+        freq_selected = st.selectbox("어지럼증 발생 빈도", list(frequency_options.keys()), key="frequency")
+        inputs['symptoms_frequency'] = float(frequency_options[freq_selected])
+
+        inputs['symptoms_recurrence'] = float(st.checkbox("재발성 어지럼증", key="recurrence"))
+
+        # 지속 시간
+        duration_cat_options = {
+            "수 초": 1, "수 분": 2, "수 시간": 3, "수 일": 4
+        }
+        duration_selected = st.selectbox("어지럼증 지속 시간", list(duration_cat_options.keys()), key="duration")
+        inputs['symptoms_duration_minutes_cat_gen'] = float(duration_cat_options[duration_selected])
+
+        inputs['symptoms_duration_minutes_cat_gen_is_several_sec'] = 1.0 if duration_selected == "수 초" else 0.0
+        inputs['symptoms_duration_minutes_cat_gen_is_several_min'] = 1.0 if duration_selected == "수 분" else 0.0
+        inputs['symptoms_duration_minutes_cat_gen_is_several_hours'] = 1.0 if duration_selected == "수 시간" else 0.0
+        inputs['symptoms_duration_minutes_cat_gen_is_several_days'] = 1.0 if duration_selected == "수 일" else 0.0
+
+        inputs['symptoms_duration_minutes_cat_20m'] = inputs['symptoms_duration_minutes_cat_gen']
+        inputs['symptoms_duration_minutes_cat_20m_is_several_sec'] = inputs['symptoms_duration_minutes_cat_gen_is_several_sec']
+        inputs['symptoms_duration_minutes_cat_20m_is_several_min'] = inputs['symptoms_duration_minutes_cat_gen_is_several_min']
+        inputs['symptoms_duration_minutes_cat_20m_is_several_hours'] = inputs['symptoms_duration_minutes_cat_gen_is_several_hours']
+        inputs['symptoms_duration_minutes_cat_20m_is_several_days'] = inputs['symptoms_duration_minutes_cat_gen_is_several_days']
+
+        duration_minutes_map = {"수 초": 0.5, "수 분": 5, "수 시간": 120, "수 일": 1440}
+        inputs['symptoms_duration_minutes'] = duration_minutes_map[duration_selected]
+
+        # 과거 발생 시점
+        remote_cat_options = {
+            "첫 발작": 0, "30일 이내": 1, "1년 이내": 2, "1년 이상": 3
+        }
+        remote_selected = st.selectbox("과거 어지럼증 발생 시점", list(remote_cat_options.keys()), key="remote")
+        inputs['symptom_remote_cat'] = float(remote_cat_options[remote_selected])
+        inputs['symptom_remote_cat_is_1st_attack'] = 1.0 if remote_selected == "첫 발작" else 0.0
+        inputs['symptom_remote_cat_is_within_30days'] = 1.0 if remote_selected == "30일 이내" else 0.0
+        inputs['symptom_remote_cat_is_within_1years'] = 1.0 if remote_selected == "1년 이내" else 0.0
+        inputs['symptom_remote_cat_is_over_1year'] = 1.0 if remote_selected == "1년 이상" else 0.0
+
+        st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
+
+        # ========== 동반 증상 ==========
+        st.markdown('<div class="section-header">🤢 동반 증상</div>', unsafe_allow_html=True)
+
+        inputs['symptoms_nausea'] = float(st.checkbox("오심 (메스꺼움)", key="nausea"))
+        inputs['symptoms_vomiting'] = float(st.checkbox("구토", key="vomiting"))
+        inputs['symptoms_headache'] = float(st.checkbox("두통", key="headache"))
+        inputs['symptoms_black_out'] = float(st.checkbox("실신/눈앞이 캄캄함", key="blackout"))
+
+        st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
+
+        # ========== 이과적 증상 ==========
+        st.markdown('<div class="section-header">👂 이과적 증상</div>', unsafe_allow_html=True)
+
+        inputs['symptoms_hearing_impairment_combined'] = float(st.checkbox("청력 저하", key="hearing"))
+        inputs['symptoms_tinnitus'] = float(st.checkbox("이명", key="tinnitus"))
+        inputs['symptoms_ear_fullness'] = float(st.checkbox("이충만감", key="ear_fullness"))
+
+        st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
+
+        # ========== 악화/완화 요인 ==========
+        st.markdown('<div class="section-header">⚡ 악화/완화 요인</div>', unsafe_allow_html=True)
+
+        st.markdown("**악화 요인**")
+        inputs['symptoms_agg_factor_position_change'] = float(st.checkbox("체위 변화 시 악화", key="agg_position"))
+        inputs['symptoms_agg_factor_head_rotation'] = float(st.checkbox("머리 회전 시 악화", key="agg_head"))
+        inputs['symptoms_agg_factor_eyes_moving'] = float(st.checkbox("눈 움직일 때 악화", key="agg_eyes"))
+        inputs['symptoms_agg_factor_moving'] = float(st.checkbox("움직일 때 악화", key="agg_moving"))
+        inputs['symptoms_agg_factor_no_moving'] = float(st.checkbox("가만히 있을 때 악화", key="agg_no_moving"))
+        inputs['symptoms_agg_factor_position_change_combined'] = inputs['symptoms_agg_factor_position_change']
+
+        st.markdown("**완화 요인**")
+        inputs['symptoms_rel_factor_rest'] = float(st.checkbox("휴식 시 완화", key="rel_rest"))
+        inputs['symptoms_rel_factor_eyes_closed'] = float(st.checkbox("눈 감으면 완화", key="rel_eyes"))
+
+        st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
+
+        # ========== 과거력 ==========
+        st.markdown('<div class="section-header">📜 과거력</div>', unsafe_allow_html=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            inputs['history_dm'] = float(st.checkbox("당뇨병", key="hist_dm"))
+            inputs['history_htn'] = float(st.checkbox("고혈압", key="hist_htn"))
+            inputs['history_ear_disease'] = float(st.checkbox("귀 질환", key="hist_ear"))
+            inputs['history_brain_disease'] = float(st.checkbox("뇌질환", key="hist_brain"))
+            inputs['history_thyroid_disease'] = float(st.checkbox("갑상선질환", key="hist_thyroid"))
+            inputs['history_psychiatric'] = float(st.checkbox("정신과질환", key="hist_psych"))
+
+        with col2:
+            inputs['history_coronary_disease'] = float(st.checkbox("관상동맥질환", key="hist_coronary"))
+            inputs['history_trauma'] = float(st.checkbox("외상력", key="hist_trauma"))
+            inputs['history_entop'] = float(st.checkbox("이비인후과 수술력", key="hist_entop"))
+            inputs['history_metabolic_disease'] = float(st.checkbox("대사질환", key="hist_metabolic"))
+            inputs['history_autoimmune_disease'] = float(st.checkbox("자가면역질환", key="hist_autoimmune"))
+            inputs['history_respiratory_disease'] = float(st.checkbox("호흡기질환", key="hist_respiratory"))
+
+        other_history = [
+            'history_pul_tbc', 'history_asthma', 'history_kidney', 'history_neckop',
+            'history_stomach', 'history_bph', 'history_gynecologic', 'history_eye_disease',
+            'history_pci', 'history_abdominalop', 'history_orthopedicop', 'history_ra'
+        ]
+        for h in other_history:
+            if h not in inputs:
+                inputs[h] = 0.0
+
+        st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
+
+        # ========== 신체검사 소견 ==========
+        st.markdown('<div class="section-header">🔍 신체검사 소견</div>', unsafe_allow_html=True)
+
+        st.markdown("**안진 검사**")
+        col1, col2 = st.columns(2)
+        with col1:
+            inputs['etc_sn_right'] = float(st.checkbox("자발안진 (우)", key="sn_r"))
+            inputs['etc_gaze_right'] = float(st.checkbox("주시안진 (우)", key="gaze_r"))
+            inputs['etc_dht_right'] = float(st.checkbox("Dix-Hallpike (우)", key="dht_r"))
+            inputs['etc_rht_right'] = float(st.checkbox("Roll test (우)", key="rht_r"))
+        with col2:
+            inputs['etc_sn_left'] = float(st.checkbox("자발안진 (좌)", key="sn_l"))
+            inputs['etc_gaze_left'] = float(st.checkbox("주시안진 (좌)", key="gaze_l"))
+            inputs['etc_dht_left'] = float(st.checkbox("Dix-Hallpike (좌)", key="dht_l"))
+            inputs['etc_rht_left'] = float(st.checkbox("Roll test (좌)", key="rht_l"))
+
+        st.markdown("**기타 검사**")
+        col1, col2 = st.columns(2)
+        with col1:
+            inputs['etc_hit_right'] = float(st.checkbox("HIT (우)", key="hit_r"))
+            inputs['etc_hsn_right'] = float(st.checkbox("HSN (우)", key="hsn_r"))
+            inputs['etc_htt_right'] = float(st.checkbox("HTT (우)", key="htt_r"))
+        with col2:
+            inputs['etc_hit_left'] = float(st.checkbox("HIT (좌)", key="hit_l"))
+            inputs['etc_hsn_left'] = float(st.checkbox("HSN (좌)", key="hsn_l"))
+            inputs['etc_htt_left'] = float(st.checkbox("HTT (좌)", key="htt_l"))
+
+        other_etc = [
+            'etc_gn_right', 'etc_gn_left', 'etc_skew_deviation_right', 'etc_skew_deviation_left',
+            'etc_weber_right', 'etc_weber_left'
+        ]
+        for e in other_etc:
+            if e not in inputs:
+                inputs[e] = 0.0
+
+        # 예측 버튼 (form 제출 → 이때만 rerun)
+        submitted = st.form_submit_button("🔮 예측 실행", type="primary", use_container_width=True)
+
+    return inputs, submitted
 
 # ========================================
 # 예측 함수
 # ========================================
+@st.cache_resource
+def get_onnx_session(disease_name):
+    """질환별 onnxruntime 세션 생성 (.onnx export + onnxruntime 설치 시에만 사용)
+
+    모델을 offline에서 model.save_model(f"{name}.onnx", format='onnx')로
+    변환해 모델 캐시 경로에 두면 CatBoost 대신 onnxruntime으로 추론한다.
+    """
+    onnx_path = os.path.join(
+        tempfile.gettempdir(), f"label_{disease_name.lower()}_model.onnx"
+    )
+    if not os.path.exists(onnx_path):
+        return None
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        return None
+    try:
+        return ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+    except Exception:
+        return None
+
+def _predict_one(model, session, pool, row):
+    """단일 질환 예측 확률 (ONNX 세션이 있으면 onnxruntime, 없으면 CatBoost)"""
+    if session is not None:
+        # CatBoost ONNX export의 출력: [label, probabilities]
+        return session.run(None, {'features': row})[1][0][1]
+    return model.predict(pool, prediction_type='Probability', thread_count=1)[0][1]
+
+# 캐시 키에 모델 dict가 들어가지 않도록 load_models() 결과를 담아두는 모듈 레벨 참조
+_MODELS_SINGLETON = {}
+
+@st.cache_data
+def _cached_probs(row_bytes):
+    """입력행이 같으면 5개 모델 추론 전체를 생략 (행 바이트 기준 캐시)"""
+    row = np.frombuffer(row_bytes, dtype=np.float32).reshape(1, -1)
+    input_df = pd.DataFrame(row.copy(), columns=_FEATURE_COLUMNS, copy=False)
+    return predict_all_models(_MODELS_SINGLETON, input_df)
+
 def predict_all_models(models, input_df):
-    """모든 모델에서 예측 확률 계산"""
+    """모든 모델에서 예측 확률 계산 (모델별 병렬 실행)"""
     probabilities = {}
-    
-    for name, model in models.items():
-        try:
-            prob = model.predict_proba(input_df)[0][1]
-            probabilities[name] = prob
-        except Exception as e:
-            st.error(f"{name} 모델 예측 오류: {e}")
-            probabilities[name] = 0.0
-    
+
+    # DataFrame → C++ feature matrix 변환은 1회만 수행하고 Pool을 모든 모델에 재사용
+    row = input_df.values.astype(np.float32)
+    pool = Pool(row)
+
+    # 세션 조회는 Streamlit 캐시를 쓰므로 메인 스레드에서 미리 수행
+    sessions = {name: get_onnx_session(name) for name in models}
+
+    # CatBoost/onnxruntime 모두 C++ 코어에서 GIL을 해제 → 독립적인 5개 모델을 스레드로 병렬 실행
+    # (모델당 thread_count=1로 고정해 스레드 폭증 방지)
+    with ThreadPoolExecutor(max_workers=len(models)) as executor:
+        futures = {
+            name: executor.submit(_predict_one, model, sessions[name], pool, row)
+            for name, model in models.items()
+        }
+
+    # 실패를 0.0으로 삼키면 _cached_probs가 잘못된 확률을 캐시하므로 그대로 전파
+    for name in models:
+        probabilities[name] = futures[name].result()
+
     return probabilities
 
 def get_top_prediction(probabilities):
@@ -410,99 +526,109 @@ def get_top_prediction(probabilities):
 # ========================================
 # SHAP 분석 함수
 # ========================================
-def generate_shap_plot(model, input_df, disease_name):
-    """개별 환자에 대한 SHAP waterfall plot + bar plot 생성"""
+@lru_cache(maxsize=32)
+def _shap_row(disease_name, row_bytes):
+    """질환·입력행 단위로 TreeSHAP 결과 메모이제이션 (rerun 시 재계산 생략)"""
+    arr = np.frombuffer(row_bytes, dtype=np.float32).reshape(1, -1)
+    model = load_models()[disease_name]
+    # 단일 행에서는 OpenMP 스레드 분배/배리어 비용이 계산보다 큼 → 1 스레드 고정
+    return model.get_feature_importance(Pool(arr), type='ShapValues', thread_count=1)
+
+def _fig_to_png(fig):
+    """Figure를 PNG 바이트로 직렬화하고 반드시 close (전역 Gcf 누수 방지)"""
     try:
-        plt.rcParams['font.family'] = 'DejaVu Sans'
-        plt.rcParams['axes.unicode_minus'] = False
-        
-        explainer = shap.TreeExplainer(model)
-        shap_values = explainer.shap_values(input_df)
-        
-        if isinstance(shap_values, list):
-            sv = shap_values[1][0]
-            base_value = explainer.expected_value[1]
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', dpi=100, bbox_inches='tight',
+                    pil_kwargs={'compress_level': 1})
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
+
+@st.cache_data(hash_funcs={pd.DataFrame: lambda df: tuple(df.values[0])})
+def generate_shap_plot(input_df, disease_name):
+    """개별 환자에 대한 SHAP waterfall + bar plot을 PNG 바이트로 생성 (입력이 같으면 캐시 재사용)"""
+    # CatBoost 내장 C++ TreeSHAP 사용 (마지막 열은 base value)
+    sv_full = _shap_row(disease_name, input_df.values.astype(np.float32).tobytes())
+    base_value = sv_full[0, -1]
+    sv = sv_full[0, :-1]
+
+    feature_names = list(input_df.columns)
+    
+    abs_sv = np.abs(sv)
+
+    # Top 10 features for waterfall (전체 정렬 대신 top-k 부분 선택)
+    idx10 = np.argpartition(abs_sv, -10)[-10:]
+    sorted_idx = idx10[np.argsort(abs_sv[idx10])[::-1]]
+    top_features = [feature_names[i] for i in sorted_idx]
+    top_values = sv[sorted_idx]
+    top_data = input_df.values[0][sorted_idx]
+    
+    f_x = base_value + np.sum(sv)
+    
+    # Waterfall plot
+    fig_waterfall, ax = plt.subplots(figsize=(7, 5))
+    
+    y_pos = range(len(top_features))
+    colors = ['#ff6b6b' if v > 0 else '#4dabf7' for v in top_values]
+    
+    bars = ax.barh(y_pos, top_values, color=colors, height=0.6)
+    ax.set_yticks(y_pos)
+    
+    # 정수값은 '1 = feat', 나머지는 '2.5 = feat' 형태로 일괄 포맷 (분기 없이 벡터화)
+    ints = top_data.astype(int)
+    int_mask = top_data == ints
+    labels_int = np.char.add(np.char.mod('%d = ', ints), top_features)
+    labels_float = np.char.add(np.char.mod('%.2g = ', top_data), top_features)
+    y_labels = np.where(int_mask, labels_int, labels_float).tolist()
+
+    ax.set_yticklabels(y_labels, fontsize=9)
+    ax.invert_yaxis()
+    ax.set_xlabel('SHAP value', fontsize=9)
+    ax.axvline(x=0, color='black', linewidth=0.5)
+    
+    for bar, val in zip(bars, top_values):
+        width = bar.get_width()
+        if val >= 0:
+            label = f"+{val:.2f}"
         else:
-            sv = shap_values[0]
-            base_value = explainer.expected_value
-        
-        feature_names = list(input_df.columns)
-        
-        # Top 10 features for waterfall
-        sorted_idx = np.argsort(np.abs(sv))[::-1][:10]
-        top_features = [feature_names[i] for i in sorted_idx]
-        top_values = sv[sorted_idx]
-        top_data = input_df.values[0][sorted_idx]
-        
-        f_x = base_value + np.sum(sv)
+            label = f"{val:.2f}"
         
-        # Waterfall plot
-        fig_waterfall, ax = plt.subplots(figsize=(7, 5))
-        
-        y_pos = range(len(top_features))
-        colors = ['#ff6b6b' if v > 0 else '#4dabf7' for v in top_values]
-        
-        bars = ax.barh(y_pos, top_values, color=colors, height=0.6)
-        ax.set_yticks(y_pos)
-        
-        y_labels = []
-        for i in range(len(top_features)):
-            val = top_data[i]
-            if isinstance(val, float) and val == int(val):
-                y_labels.append(f"{int(val)} = {top_features[i]}")
-            elif isinstance(val, float):
-                y_labels.append(f"{val:.2g} = {top_features[i]}")
-            else:
-                y_labels.append(f"{val} = {top_features[i]}")
-        
-        ax.set_yticklabels(y_labels, fontsize=9)
-        ax.invert_yaxis()
-        ax.set_xlabel('SHAP value', fontsize=9)
-        ax.axvline(x=0, color='black', linewidth=0.5)
-        
-        for bar, val in zip(bars, top_values):
-            width = bar.get_width()
-            if val >= 0:
-                label = f"+{val:.2f}"
-            else:
-                label = f"{val:.2f}"
-            
-            if abs(width) > 0.5:
-                x_pos = width / 2
-                color = 'white'
-                ha = 'center'
-            else:
-                x_pos = width + 0.05 * (1 if width >= 0 else -1)
-                color = 'black'
-                ha = 'left' if width >= 0 else 'right'
-            
-            ax.text(x_pos, bar.get_y() + bar.get_height()/2, 
-                   label, ha=ha, va='center', fontsize=8, color=color, fontweight='bold')
-        
-        ax.set_title(f'f(x) = {f_x:.3f}', fontsize=10)
-        plt.tight_layout()
-        
-        # Bar plot (Top 20)
-        sorted_idx_20 = np.argsort(np.abs(sv))[::-1][:20]
-        top_features_20 = [feature_names[i] for i in sorted_idx_20]
-        abs_values_20 = np.abs(sv[sorted_idx_20])
-        
-        fig_bar, ax_bar = plt.subplots(figsize=(8, 7))
-        y_pos_20 = range(len(top_features_20))
-        ax_bar.barh(y_pos_20, abs_values_20, color='#1E88E5', height=0.7)
-        ax_bar.set_yticks(y_pos_20)
-        ax_bar.set_yticklabels(top_features_20, fontsize=9)
-        ax_bar.invert_yaxis()
-        ax_bar.set_xlabel('mean(|SHAP value|) (average impact on model output magnitude)', fontsize=9)
-        ax_bar.tick_params(axis='x', labelsize=8)
-        ax_bar.spines['top'].set_visible(False)
-        ax_bar.spines['right'].set_visible(False)
-        plt.tight_layout()
+        if abs(width) > 0.5:
+            x_pos = width / 2
+            color = 'white'
+            ha = 'center'
+        else:
+            x_pos = width + 0.05 * (1 if width >= 0 else -1)
+            color = 'black'
+            ha = 'left' if width >= 0 else 'right'
         
-        return fig_waterfall, fig_bar
-    except Exception as e:
-        st.error(f"SHAP 분석 오류: {e}")
-        return None, None
+        ax.text(x_pos, bar.get_y() + bar.get_height()/2, 
+               label, ha=ha, va='center', fontsize=8, color=color, fontweight='bold')
+    
+    ax.set_title(f'f(x) = {f_x:.3f}', fontsize=10)
+    plt.tight_layout()
+    png_waterfall = _fig_to_png(fig_waterfall)
+
+    # Bar plot (Top 20)
+    idx20 = np.argpartition(abs_sv, -20)[-20:]
+    sorted_idx_20 = idx20[np.argsort(abs_sv[idx20])[::-1]]
+    top_features_20 = [feature_names[i] for i in sorted_idx_20]
+    abs_values_20 = abs_sv[sorted_idx_20]
+    
+    fig_bar, ax_bar = plt.subplots(figsize=(8, 7))
+    y_pos_20 = range(len(top_features_20))
+    ax_bar.barh(y_pos_20, abs_values_20, color='#1E88E5', height=0.7)
+    ax_bar.set_yticks(y_pos_20)
+    ax_bar.set_yticklabels(top_features_20, fontsize=9)
+    ax_bar.invert_yaxis()
+    ax_bar.set_xlabel('mean(|SHAP value|) (average impact on model output magnitude)', fontsize=9)
+    ax_bar.tick_params(axis='x', labelsize=8)
+    ax_bar.spines['top'].set_visible(False)
+    ax_bar.spines['right'].set_visible(False)
+    plt.tight_layout()
+    png_bar = _fig_to_png(fig_bar)
+
+    return png_waterfall, png_bar
 
 # ========================================
 # 메인 앱
@@ -517,21 +643,30 @@ def main():
     if models is None:
         st.error("모델을 로드할 수 없습니다. Google Drive 연결 및 Secrets 설정을 확인하세요.")
         st.stop()
+
+    _MODELS_SINGLETON.clear()
+    _MODELS_SINGLETON.update(models)
     
-    # 사이드바 입력
-    inputs = create_sidebar_inputs()
-    
-    # DataFrame 생성
-    input_data = {feat: inputs.get(feat, np.nan) for feat in INPUT_FEATURES}
-    input_df = pd.DataFrame([input_data])
+    # 사이드바 입력 (form 제출 시에만 예측 실행)
+    inputs, predict_button = create_sidebar_inputs()
     
-    # 예측 버튼 (하단 고정)
-    predict_button = st.sidebar.button("🔮 예측 실행", type="primary", use_container_width=True, key="predict_btn")
+    # DataFrame 생성 (미리 할당한 float32 배열에 채워 dtype 추론 비용 제거)
+    row = np.zeros((1, len(INPUT_FEATURES)), dtype=np.float32)
+    for key, value in inputs.items():
+        j = _FEAT_INDEX.get(key)
+        if j is not None:
+            row[0, j] = value
+    input_df = pd.DataFrame(row, columns=_FEATURE_COLUMNS, copy=False)
     
     if predict_button:
         
         with st.spinner("예측 중..."):
-            probabilities = predict_all_models(models, input_df)
+            # 오류 처리는 캐시 함수 밖에서: 실패하면 캐시에 남지 않고 다음 제출 때 재시도
+            try:
+                probabilities = _cached_probs(input_df.values.astype(np.float32).tobytes())
+            except Exception as e:
+                st.error(f"모델 예측 오류: {e}")
+                st.stop()
             top_disease, top_prob = get_top_prediction(probabilities)
         
         # 결과 표시
@@ -560,17 +695,19 @@ def main():
         st.markdown(f"**{DISEASE_NAMES_KR[top_disease]}** 예측에 각 변수가 어떻게 기여했는지 보여줍니다.")
         
         with st.spinner("SHAP 분석 중..."):
-            fig_waterfall, fig_bar = generate_shap_plot(models[top_disease], input_df, top_disease)
-            
-            if fig_waterfall and fig_bar:
+            # 오류 처리는 캐시 함수 밖에서: 실패한 (None, None)이 캐시에 남지 않게 한다
+            try:
+                png_waterfall, png_bar = generate_shap_plot(input_df, top_disease)
+            except Exception as e:
+                st.error(f"SHAP 분석 오류: {e}")
+                plt.close('all')  # 예외 경로에서 미처 close되지 않은 figure 정리
+                png_waterfall, png_bar = None, None
+
+            if png_waterfall and png_bar:
                 with st.expander("📊 개별 예측 기여도 (Top 10)", expanded=False):
                     col1, col2 = st.columns([2, 1])
                     with col1:
-                        buf1 = io.BytesIO()
-                        fig_waterfall.savefig(buf1, format='png', dpi=150, bbox_inches='tight')
-                        buf1.seek(0)
-                        plt.close(fig_waterfall)
-                        st.image(buf1, use_container_width=True)
+                        st.image(png_waterfall, use_container_width=True)
                     with col2:
                         st.markdown("""
                         **📖 해석 가이드**
@@ -590,11 +727,7 @@ def main():
                 with st.expander("📈 변수 중요도 (Top 20)", expanded=False):
                     col1, col2 = st.columns([2, 1])
                     with col1:
-                        buf2 = io.BytesIO()
-                        fig_bar.savefig(buf2, format='png', dpi=150, bbox_inches='tight')
-                        buf2.seek(0)
-                        plt.close(fig_bar)
-                        st.image(buf2, use_container_width=True)
+                        st.image(png_bar, use_container_width=True)
                     with col2:
                         st.markdown("""
                         **📖 해석 가이드**